@@ -2,8 +2,9 @@ import os
 import sys
 from pathlib import Path
 import duckdb  # https://duckdb.org
-import pygrametl  # https://pygrametl.org
-from pygrametl.tables import CachedDimension, FactTable
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import logging
 
 # Configure logging for information and errors
@@ -13,18 +14,136 @@ logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 # DW definition
 PROJECT_ROOT = Path(__file__).parent.parent
 duckdb_filename = str(PROJECT_ROOT / "data" / "dw.duckdb")
+# DuckDB resources, overridable through the environment (memory_limit keeps DuckDB's default if unset)
+DUCKDB_THREADS = int(os.environ.get("DW_THREADS", os.cpu_count() or 1))
+DUCKDB_MEMORY_LIMIT = os.environ.get("DW_MEMORY_LIMIT")
+# Aircraft manufacturers query_utilization can be restricted to (the DW stores any manufacturer)
+MANUFACTURERS = ("Airbus", "Boeing")
+# File formats export_all_metrics can write (DuckDB COPY formats)
+EXPORT_FORMATS = ("parquet", "csv")
+# Result formats of the KPI queries (list of tuples, pandas DataFrame or Arrow table)
+RETURN_FORMATS = ("rows", "df", "arrow")
+# Decimals each KPI is rounded to when returned (KPIs not listed use 2)
+KPI_DECIMALS = {"RRh": 3, "PRRh": 3, "MRRh": 3}
+# DW tables, dimensions before the facts referencing them and the rollup derived from them
+TABLES = (
+    "Aircrafts",
+    "Airports",
+    "Date",
+    "DailyAircraftStats",
+    "TotalMaintenanceReports",
+    "ManufacturerYearStats",
+)
+# Surrogate key and lookup attribute of each dimension (Date is seeded, the others loaded from the sources)
+DIMENSIONS = {
+    "Aircrafts": ("aircraftid", "aircraftregistration"),
+    "Airports": ("airportid", "airportcode"),
+    "Date": ("dateid", "date"),
+}
+# WAL size before an automatic checkpoint while an existing DW is being loaded incrementally;
+# a failed load is simply rerun from the sources, so checkpoints are deferred until close()
+BULK_CHECKPOINT_THRESHOLD = "1GB"
+
+# Per manufacturer and year sums of the fact table behind every KPI, aggregated first
+# per aircraft and year (so aircraft are counted with a plain COUNT(*)) and then per
+# manufacturer. Materialized as ManufacturerYearStats by DW.build_rollup after each load
+ROLLUP_SQL = """
+    WITH aircraft_year AS (
+        SELECT f.aircraftid, d.year,
+            SUM(f.flighthours) AS fh,
+            SUM(f.takeoffs) AS tko,
+            SUM(f.ADOSS) AS adoss,
+            SUM(f.ADOSU) AS adosu,
+            SUM(f.delays) AS dly,
+            SUM(f.cancellations) AS cnl,
+            SUM(f.delayduration) AS dlydur,
+            SUM(f.pilotreports) AS pirep,
+            SUM(f.maintenancereports) AS marep
+        FROM DailyAircraftStats f
+            JOIN Date d USING (dateid)
+        GROUP BY f.aircraftid, d.year
+    )
+    SELECT ac.manufacturer, y.year,
+        SUM(y.fh) AS fh,
+        SUM(y.tko) AS tko,
+        SUM(y.adoss) AS adoss,
+        SUM(y.adosu) AS adosu,
+        SUM(y.dly) AS dly,
+        SUM(y.cnl) AS cnl,
+        SUM(y.dlydur) AS dlydur,
+        SUM(y.pirep) AS pirep,
+        SUM(y.marep) AS marep,
+        COUNT(*) AS n_ac
+    FROM aircraft_year y
+        JOIN Aircrafts ac USING (aircraftid)
+    GROUP BY ac.manufacturer, y.year
+"""
+
+# All KPIs per manufacturer and year, derived from the few rows of ManufacturerYearStats
+# instead of the fact table. KPIs are returned as raw DOUBLEs and rounded once in
+# Python (see KPI_DECIMALS); the ROUNDs left in SQL are part of the KPI definitions
+# shared with the baseline queries
+KPI_SQL = """
+    WITH per_ac AS (
+        -- per-aircraft averages reused by several KPIs
+        SELECT *,
+            ROUND(fh/n_ac, 2) AS fh_ac,
+            ROUND(tko::DOUBLE / n_ac, 2) AS tko_ac,
+            ROUND((adoss+adosu)/n_ac, 2) AS ados_ac
+        FROM ManufacturerYearStats
+    )
+    SELECT manufacturer, year,
+        fh_ac AS FH,
+        tko_ac AS TakeOff,
+        adoss/n_ac AS ADOSS,
+        adosu/n_ac AS ADOSU,
+        ados_ac AS ADOS,
+        365 - ados_ac AS ADIS,
+        fh_ac / ((365 - ados_ac) * 24) AS DU,
+        tko_ac / (365 - ados_ac) AS DC,
+        100.0*dly/tko AS DYR,
+        100.0*cnl/tko AS CNR,
+        100.0 - 100.0*(dly+cnl)/tko AS TDR,
+        100 * ROUND(dlydur/dly, 2) AS ADD,
+        1000*ROUND((pirep+marep)/fh, 3) AS RRh,
+        100*ROUND((pirep+marep)/tko, 2) AS RRc,
+        1000*ROUND(pirep/fh, 3) AS PRRh,
+        100*ROUND(pirep/tko, 2) AS PRRc,
+        1000*ROUND(marep/fh, 3) AS MRRh,
+        100*ROUND(marep/tko, 2) AS MRRc
+    FROM per_ac
+"""
 
 
 class DW:
     # Data Warehouse class for managing DuckDB connections and operations
 
-    def __init__(self, create=False):
-        """Initialize the DW object, creating or connecting to the DuckDB database."""
+    def __init__(self, create=False, readonly=False, incremental=False):
+        """
+        Initialize the DW object, creating or connecting to the DuckDB database.
+        With readonly=True the existing file is opened read-only, so several query processes
+        can share it (incompatible with create).
+        With incremental=True the existing file is kept, missing tables are created and fact
+        loads update the rows already in the DW instead of requiring a full reload.
+        """
+        if readonly and (create or incremental):
+            raise ValueError("A read-only DW cannot be created or loaded")
         # connection
-        if create and os.path.exists(duckdb_filename):
-            os.remove(duckdb_filename)
         try:
-            self.conn_duckdb = duckdb.connect(duckdb_filename)
+            # A new DW is built in memory and replaces its file only in close(), so the
+            # previous DW stays readable during the load and survives a failed one
+            self.conn_duckdb = duckdb.connect(
+                ":memory:" if create else duckdb_filename, read_only=readonly
+            )
+            self.conn_duckdb.execute(f"PRAGMA threads={DUCKDB_THREADS}")
+            if DUCKDB_MEMORY_LIMIT:
+                self.conn_duckdb.execute(
+                    f"PRAGMA memory_limit='{DUCKDB_MEMORY_LIMIT}'"
+                )
+            if incremental:
+                self.conn_duckdb.execute(
+                    f"SET checkpoint_threshold='{BULK_CHECKPOINT_THRESHOLD}'"
+                )
             logging.info("Connection to the DW created successfully")
         except duckdb.Error as e:
             logging.error(
@@ -32,13 +151,13 @@ class DW:
             )
             sys.exit(1)
 
-        # Create tables in DuckDB if required
-        if create:
+        # Create tables in DuckDB if required (only the missing ones)
+        if create or incremental:
             try:
                 # dimensions tables first
                 self.conn_duckdb.execute(
                     """
-                    CREATE TABLE Aircrafts (
+                    CREATE TABLE IF NOT EXISTS Aircrafts (
                         aircraftid INT PRIMARY KEY,
                         aircraftregistration VARCHAR(6) UNIQUE NOT NULL,
                         model VARCHAR(100) NOT NULL,
@@ -48,17 +167,17 @@ class DW:
                 )
                 self.conn_duckdb.execute(
                     """
-                    CREATE TABLE Date(
+                    CREATE TABLE IF NOT EXISTS Date(
                         dateid INT PRIMARY KEY,
                         date DATE UNIQUE NOT NULL,
-                        month INT NOT NULL, --YYYYMM
+                        month INT GENERATED ALWAYS AS (year(date) * 100 + month(date)) VIRTUAL, --YYYYMM
                         year INT NOT NULL  --YYYY
                     );
                 """
                 )
                 self.conn_duckdb.execute(
                     """
-                    CREATE TABLE Airports(
+                    CREATE TABLE IF NOT EXISTS Airports(
                         airportid INT PRIMARY KEY,
                         airportcode VARCHAR(3) UNIQUE NOT NULL
                     );
@@ -67,7 +186,7 @@ class DW:
                 # fact tables next
                 self.conn_duckdb.execute(
                     """
-                    CREATE TABLE DailyAircraftStats (
+                    CREATE TABLE IF NOT EXISTS DailyAircraftStats (
                         dateid INT,
                         aircraftid INT,
                         takeoffs INT NOT NULL,
@@ -87,7 +206,7 @@ class DW:
                 )
                 self.conn_duckdb.execute(
                     """
-                    CREATE TABLE TotalMaintenanceReports(
+                    CREATE TABLE IF NOT EXISTS TotalMaintenanceReports(
                         airportid INT,
                         aircraftid INT,
                         takeoffs INT NOT NULL,
@@ -99,6 +218,10 @@ class DW:
                     );
                 """
                 )
+                # rollup of the facts (empty until build_rollup), so every table in TABLES exists
+                self.conn_duckdb.execute(
+                    f"CREATE TABLE IF NOT EXISTS ManufacturerYearStats AS {ROLLUP_SQL}"
+                )
                 self.conn_duckdb.commit()
                 logging.info("All DW tables created successfully")
 
@@ -106,126 +229,256 @@ class DW:
                 logging.error("Error creating the DW tables: %s", e)
                 sys.exit(2)
 
-        # Link DuckDB and pygrametl
-        self.conn_pygrametl = pygrametl.ConnectionWrapper(self.conn_duckdb)
+        # Whether the DW is built in memory (copied to duckdb_filename in close)
+        self.in_memory = create
+        # Whether checkpoints are deferred for the bulk load (restored in close)
+        self.bulk_mode = incremental
+        # Whether fact loads replace the rows already in the DW with the same key
+        self.incremental = incremental
 
-        # Create dimension and fact table pygrametl objects
-        self.aircraft_dim = CachedDimension(
-            name="Aircrafts",
-            key="aircraftid",
-            attributes=["aircraftregistration", "model", "manufacturer"],
-            lookupatts=["aircraftregistration"],
-        )
+        # Names of the KPI queries already prepared on this connection (see _fetch)
+        self.prepared: set[str] = set()
+
+        # Plain dict cache of the aircraft surrogate keys (see preload_aircraft_map)
+        self.aircraft_map: dict = {}
 
-        self.date_dim = CachedDimension(
-            name="Date",
-            key="dateid",
-            attributes=["date", "month", "year"],
-            lookupatts=["date"],
+    def preload_aircraft_map(self):
+        """
+        Prec: Aircrafts already loaded in the DW
+        Post: aircraft_map maps each aircraft registration to its surrogate key, used to validate
+        reports before the facts are built (the fact loads join the dimensions instead, see load_fact)
+        """
+        self.aircraft_map = dict(
+            self.conn_duckdb.execute(
+                "SELECT aircraftregistration, aircraftid FROM Aircrafts"
+            ).fetchall()
         )
 
-        self.airport_dim = CachedDimension(
-            name="Airports",
-            key="airportid",
-            attributes=["airportcode"],
-            lookupatts=["airportcode"],
+    def load_fact(
+        self,
+        table: str,
+        df: pd.DataFrame,
+        dimensions: tuple[str, ...],
+        order_by: str = "",
+        replace: bool = False,
+    ):
+        """
+        Prec: df contains the measures of table and the lookup attribute of each of dimensions
+        Post: appends the rows of df to table with a single INSERT ... SELECT that resolves their
+        surrogate keys by joining the dimensions inside DuckDB (rows without a dimension member
+        are skipped), sorted by order_by if given. With replace=True, rows whose primary key is
+        already in table are updated instead
+        """
+        keys = ", ".join(f"{dim}.{DIMENSIONS[dim][0]}" for dim in dimensions)
+        lookupatts = ", ".join(DIMENSIONS[dim][1] for dim in dimensions)
+        joins = " ".join(
+            f"JOIN {dim} ON {dim}.{DIMENSIONS[dim][1]} = s.{DIMENSIONS[dim][1]}"
+            for dim in dimensions
         )
+        order = f" ORDER BY {order_by}" if order_by else ""
+        insert = "INSERT OR REPLACE" if replace else "INSERT"
+        self.conn_duckdb.register("load_fact_source", df)
+        try:
+            self.conn_duckdb.execute(
+                f"""
+                {insert} INTO {table} BY NAME
+                SELECT {keys}, s.* EXCLUDE ({lookupatts})
+                FROM load_fact_source s {joins}{order}
+                """
+            )
+        finally:
+            self.conn_duckdb.unregister("load_fact_source")
 
-        self.daily_aircraft_fact = FactTable(
-            name="DailyAircraftStats",
-            keyrefs=("dateid", "aircraftid"),  # foreign key to dimensions
-            measures=(
-                "flighthours",
-                "takeoffs",
-                "ADOSS",
-                "ADOSU",
-                "delays",
-                "cancellations",
-                "delayduration",
-                "pilotreports",
-                "maintenancereports",
-            ),
+    def seed_date_dim(self, first_year: int, last_year: int):
+        """
+        Prec: first_year <= last_year
+        Post: Date contains every day from first_year to last_year, generated inside DuckDB
+        (days already in Date are kept with their surrogate keys)
+        """
+        self.conn_duckdb.execute(
+            """
+            INSERT INTO Date (dateid, date, year)
+            SELECT (SELECT COALESCE(MAX(dateid), 0) FROM Date) + row_number() OVER (ORDER BY d),
+                d::DATE, year(d)
+            FROM range(make_date($1, 1, 1), make_date($2 + 1, 1, 1), INTERVAL 1 DAY) t(d)
+            WHERE d::DATE NOT IN (SELECT date FROM Date)
+            """,
+            [first_year, last_year],
         )
 
-        self.total_maintenance_fact = FactTable(
-            name="TotalMaintenanceReports",
-            keyrefs=("airportid", "aircraftid"),
-            measures=("reports", "takeoffs", "flighthours"),
+    def load_dimension(self, table: str, df: pd.DataFrame):
+        """
+        Prec: table is Aircrafts or Airports and df contains its attributes
+        Post: appends the members of df not yet in table with consecutive surrogate keys
+        (assigned in lookup attribute order), with a single INSERT ... SELECT inside DuckDB
+        """
+        key, lookupatt = DIMENSIONS[table]
+        self.conn_duckdb.register("load_dimension_source", df)
+        try:
+            self.conn_duckdb.execute(
+                f"""
+                INSERT INTO {table} BY NAME
+                SELECT (SELECT COALESCE(MAX({key}), 0) FROM {table})
+                        + row_number() OVER (ORDER BY s.{lookupatt}) AS {key},
+                    s.*
+                FROM (SELECT DISTINCT ON ({lookupatt}) * FROM load_dimension_source) s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {table} d WHERE d.{lookupatt} = s.{lookupatt}
+                )
+                """
+            )
+        finally:
+            self.conn_duckdb.unregister("load_dimension_source")
+
+    def build_rollup(self):
+        """
+        Prec: fact tables already loaded in the DW
+        Post: ManufacturerYearStats holds the per manufacturer and year sums of the facts,
+        recomputed from scratch (incremental loads may replace facts of any year)
+        """
+        self.conn_duckdb.execute(
+            f"CREATE OR REPLACE TABLE ManufacturerYearStats AS {ROLLUP_SQL} ORDER BY manufacturer, year"
         )
+        # the KPI statements were bound to the replaced table
+        for name in self.prepared:
+            self.conn_duckdb.execute(f"DEALLOCATE {name}")
+        self.prepared.clear()
 
-    def query_utilization(self):
-        """Query aircraft utilization statistics for each manufacturer and year."""
-        result = self.conn_duckdb.execute(
-            """SELECT 
-                ac.manufacturer,
-                d.year AS year,
-                CAST(ROUND(SUM(f.flighthours)/COUNT(DISTINCT ac.aircraftregistration), 2) AS DECIMAL(10,2)) AS FH,
-                CAST(ROUND((SUM(f.takeoffs) // COUNT(DISTINCT ac.aircraftregistration))::DOUBLE, 2) AS DECIMAL(10,2)) AS TakeOff,
-                CAST(ROUND(SUM(f.ADOSS)/COUNT(DISTINCT ac.aircraftregistration), 2) AS DECIMAL(10,2)) AS ADOSS,
-                CAST(ROUND(SUM(f.ADOSU)/COUNT(DISTINCT ac.aircraftregistration), 2) AS DECIMAL(10,2)) AS ADOSU,
-                CAST(ROUND((SUM(f.ADOSS)+SUM(f.ADOSU))/COUNT(DISTINCT ac.aircraftregistration), 2) AS DECIMAL(10,2)) AS ADOS,
-                CAST(365 - ROUND((SUM(f.ADOSS)+SUM(f.ADOSU))/COUNT(DISTINCT ac.aircraftregistration), 2) AS DECIMAL(10,2)) AS ADIS,
-                CAST(ROUND(
-                    ROUND(SUM(f.flighthours)/COUNT(DISTINCT ac.aircraftregistration), 2) /
-                    ((365 - ROUND((SUM(f.ADOSS)+SUM(f.ADOSU))/COUNT(DISTINCT ac.aircraftregistration), 2)) * 24), 2
-                ) AS DECIMAL(10,2)) AS DU,
-                CAST(ROUND(
-                    ROUND((SUM(f.takeoffs) // COUNT(DISTINCT ac.aircraftregistration))::DOUBLE, 2) /
-                    (365 - ROUND((SUM(f.ADOSS)+SUM(f.ADOSU))/COUNT(DISTINCT ac.aircraftregistration), 2)), 2
-                ) AS DECIMAL(10,2)) AS DC,
-                CAST(100 * ROUND(SUM(f.delays)/ROUND(SUM(f.takeoffs), 2), 4) AS DECIMAL(10,2)) AS DYR,
-                CAST(100 * ROUND(SUM(f.cancellations)/ROUND(SUM(f.takeoffs), 2), 4) AS DECIMAL(10,2)) AS CNR,
-                CAST(100 - ROUND((100*(SUM(f.delays)+SUM(f.cancellations)) // SUM(f.takeoffs))::DOUBLE, 2) AS DECIMAL(10,2)) AS TDR,
-                CAST(100 * ROUND(SUM(f.delayduration)/SUM(f.delays), 2) AS DECIMAL(10,2)) AS ADD
-            FROM DailyAircraftStats f, Aircrafts ac, Date d
-            WHERE f.aircraftid = ac.aircraftid AND f.dateid = d.dateid
-            GROUP BY ac.manufacturer, d.year
-            ORDER BY ac.manufacturer, d.year;
-            """
-        ).fetchall()  # type: ignore
+    def _fetch(
+        self, name: str, sql: str, return_format: str = "rows", args: tuple = ()
+    ):
+        """
+        Prec: return_format is one of RETURN_FORMATS; args are trusted string values
+        for the parameters $1, $2, ... of sql
+        Post: executes sql as the prepared statement name (prepared on first use, so later calls
+        skip parsing and planning) and returns its result, with the KPIs rounded, as a list of
+        tuples, a pandas DataFrame or an Arrow table
+        """
+        if return_format not in RETURN_FORMATS:
+            raise ValueError(f"Unknown return format '{return_format}'")
+        if name not in self.prepared:
+            self.conn_duckdb.execute(f"PREPARE {name} AS {sql}")
+            self.prepared.add(name)
+        # EXECUTE cannot itself take Python parameters, so the values are inlined as literals
+        execute = f"EXECUTE {name}"
+        if args:
+            execute += "(" + ", ".join(f"'{arg}'" for arg in args) + ")"
+        if return_format == "arrow":
+            # straight from DuckDB's Arrow result, rounded column by column without pandas
+            table = self.conn_duckdb.execute(execute).arrow()
+            if isinstance(table, pa.RecordBatchReader):  # DuckDB >= 1.4 streams the batches
+                table = table.read_all()
+            for i, field in enumerate(table.schema):
+                if pa.types.is_floating(field.type):
+                    rounded = pc.round(table.column(i), KPI_DECIMALS.get(field.name, 2))
+                    table = table.set_column(i, field, rounded)
+            return table
+        result = self.conn_duckdb.execute(execute).df()
+        # Round every KPI in a single vectorized pass
+        kpis = result.select_dtypes("floating").columns
+        result = result.round({kpi: KPI_DECIMALS.get(kpi, 2) for kpi in kpis})
+        if return_format == "rows":
+            return list(result.itertuples(index=False, name=None))
         return result
 
-    def query_reporting(self):
+    def query_all_metrics(self, return_format="rows"):
+        """Query every utilization and reporting KPI for each manufacturer and year from the rollup."""
+        return self._fetch(
+            "kpi_all", f"{KPI_SQL} ORDER BY manufacturer, year", return_format
+        )
+
+    def query_utilization(self, return_format="rows", manufacturer=None):
+        """
+        Prec: manufacturer is None or one of MANUFACTURERS
+        Post: aircraft utilization statistics for each manufacturer and year, restricted to
+        manufacturer if given
+        """
+        if manufacturer is None:
+            name, where, args = "kpi_utilization", "", ()
+        elif manufacturer in MANUFACTURERS:
+            name, where, args = "kpi_utilization_mfr", "WHERE manufacturer = $1", (manufacturer,)
+        else:
+            raise ValueError(f"Unknown manufacturer '{manufacturer}'")
+        return self._fetch(
+            name,
+            f"""
+            SELECT manufacturer, year, FH, TakeOff, ADOSS, ADOSU, ADOS, ADIS, DU, DC, DYR, CNR, TDR, "ADD"
+            FROM ({KPI_SQL}) kpi
+            {where}
+            ORDER BY manufacturer, year
+            """,
+            return_format,
+            args,
+        )
+
+    def query_reporting(self, return_format="rows"):
         """Query reporting rates for each manufacturer and year."""
-        result = self.conn_duckdb.execute(
-            """
-            SELECT ac.manufacturer, d.year, 
-                CAST(1000*ROUND(SUM(f.pilotreports+f.maintenancereports)/SUM(f.flighthours), 3) AS DECIMAL(10,3)) as RRh,
-                CAST(100*ROUND(SUM(f.pilotreports+f.maintenancereports)/SUM(f.takeoffs), 2) AS DECIMAL(10,2)) as RRc
-            FROM DailyAircraftStats f, Aircrafts ac, Date d
-            WHERE f.aircraftid = ac.aircraftid AND f.dateid = d.dateid
-            GROUP BY ac.manufacturer, d.year
-            ORDER BY ac.manufacturer, d.year;
-            """
-        ).fetchall()
-        return result
+        return self._fetch(
+            "kpi_reporting",
+            f"""
+            SELECT manufacturer, year, RRh, RRc
+            FROM ({KPI_SQL}) kpi
+            ORDER BY manufacturer, year
+            """,
+            return_format,
+        )
 
-    def query_reporting_per_role(self):
+    def query_reporting_per_role(self, return_format="rows"):
         """Query reporting rates per role for each manufacturer and year."""
-        result = self.conn_duckdb.execute(
-            """
-            SELECT ac.manufacturer, d.year, 'PIREP' as role,
-                CAST(1000*ROUND(SUM(f.pilotreports)/SUM(f.flighthours), 3) AS DECIMAL(10,3)) as RRh,
-                CAST(100*ROUND(SUM(f.pilotreports)/SUM(f.takeoffs), 2) AS DECIMAL(10,2)) as RRc
-            FROM DailyAircraftStats f, Aircrafts ac, Date d
-            WHERE f.aircraftid = ac.aircraftid AND f.dateid = d.dateid
-            GROUP BY ac.manufacturer, d.year
-            
-            UNION ALL
-            
-            SELECT ac.manufacturer, d.year, 'MAREP' as role,
-                CAST(1000*ROUND(SUM(f.maintenancereports)/SUM(f.flighthours), 3) AS DECIMAL(10,3)) as RRh,
-                CAST(100*ROUND(SUM(f.maintenancereports)/SUM(f.takeoffs), 2) AS DECIMAL(10,2)) as RRc
-            FROM DailyAircraftStats f, Aircrafts ac, Date d
-            WHERE f.aircraftid = ac.aircraftid AND f.dateid = d.dateid
-            GROUP BY ac.manufacturer, d.year
-            
-            ORDER BY manufacturer, year, role;
+        return self._fetch(
+            "kpi_reporting_per_role",
+            f"""
+            SELECT kpi.manufacturer, kpi.year, r.role,
+                CASE r.role WHEN 'PIREP' THEN kpi.PRRh ELSE kpi.MRRh END AS RRh,
+                CASE r.role WHEN 'PIREP' THEN kpi.PRRc ELSE kpi.MRRc END AS RRc
+            FROM ({KPI_SQL}) kpi
+                CROSS JOIN (VALUES ('PIREP'), ('MAREP')) r(role)
+            ORDER BY manufacturer, year, role
+            """,
+            return_format,
+        )
+
+    def export_all_metrics(self, path: str, file_format: str = "parquet"):
+        """
+        Prec: file_format is one of EXPORT_FORMATS
+        Post: writes every KPI (unrounded) per manufacturer and year to path directly from DuckDB
+        """
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{file_format}'")
+        self.conn_duckdb.execute(
+            f"""
+            COPY ({KPI_SQL} ORDER BY manufacturer, year)
+            TO '{path.replace("'", "''")}' (FORMAT {file_format});
             """
-        ).fetchall()  # type: ignore
-        return result
+        )
 
     def close(self):
-        """Close the DW connections."""
-        self.conn_pygrametl.commit()
-        self.conn_pygrametl.close()
+        """Close the DW connection."""
+        self.conn_duckdb.commit()
+        if self.in_memory:
+            # write the whole DW to a new file with a single sequential copy, then swap it in
+            tmp_filename = duckdb_filename + ".tmp"
+            for stale in (tmp_filename, tmp_filename + ".wal"):  # left by a failed close
+                if os.path.exists(stale):
+                    os.remove(stale)
+            path = tmp_filename.replace("'", "''")
+            self.conn_duckdb.execute(f"ATTACH '{path}' AS disk")
+            try:
+                self.conn_duckdb.execute("COPY FROM DATABASE memory TO disk (SCHEMA)")
+                for table in TABLES:  # dimensions first, so the foreign keys hold
+                    columns = "* EXCLUDE (month)" if table == "Date" else "*"  # generated
+                    self.conn_duckdb.execute(
+                        f"INSERT INTO disk.{table} SELECT {columns} FROM memory.{table}"
+                    )
+            finally:
+                # release the file even if the copy failed, so it can be opened again
+                self.conn_duckdb.execute("DETACH disk")
+            # the WAL of the previous DW would be replayed onto the new file
+            if os.path.exists(duckdb_filename + ".wal"):
+                os.remove(duckdb_filename + ".wal")
+            os.replace(tmp_filename, duckdb_filename)
+        elif self.bulk_mode:
+            # write the whole load to the database file once and restore the default threshold
+            self.conn_duckdb.execute("CHECKPOINT")
+            self.conn_duckdb.execute("RESET checkpoint_threshold")
+        self.conn_duckdb.close()
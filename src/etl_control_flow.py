@@ -1,33 +1,30 @@
+import os
 from dw import DW
 import extract
 import transform
 import load
 
 if __name__ == "__main__":
-    # create a data warehouse object
-    dw = DW(create=True)
+    # create a data warehouse object (DW_INCREMENTAL=1 updates the existing DW instead)
+    incremental = os.environ.get("DW_INCREMENTAL") == "1"
+    dw = DW(create=not incremental, incremental=incremental)
     # ====================================================================================================================================
+    # extract the lookups and the source tables concurrently
+    aircrafts_lookup, reporters_lookup, flights_raw, maint_it, reports_raw = extract.extract_sources()
     # load aircraft dimension
-    load.load_aircrafts(
-        dw, transform.transform_aircrafts(extract.extract_aircraftlookup())  # type: ignore
-    )
-    load.load_airports(
-        dw, transform.transform_reporter_lookup(extract.extract_reporterslookup())  # type: ignore
-    )
-    # extract and clean data (qc and BR) needed for date_dim and fact tables
-    clean_flights_df = transform.clean_flights(extract.extract_flights())  # type:ignore
-    clean_reports_df = transform.clean_reports(
-        extract.extract_reports(), dw
-    )  # type:ignore
-    maint_it = extract.extract_maint()  # type: ignore
+    load.load_aircrafts(dw, transform.transform_aircrafts(aircrafts_lookup))  # type: ignore
+    load.load_airports(dw, transform.transform_reporter_lookup(reporters_lookup))  # type: ignore
+    # cache aircraft surrogate keys for report validation
+    dw.preload_aircraft_map()
+    # clean data (qc and BR) needed for date_dim and fact tables
+    clean_flights_df = transform.clean_flights(flights_raw)  # type:ignore
+    clean_reports_df = transform.clean_reports(reports_raw, dw)  # type:ignore
     flights_df, reports_df, maint_df = transform.valid_dates(clean_flights_df, clean_reports_df, maint_it, dw)  # type: ignore
-    # load date dimension
-    load.load_dates(
-        dw,
-        transform.get_date_dim(flights_df, reports_df, maint_df),  # type: ignore
-    )
+    # load date dimension with every day of the years covered by the flights
+    years = flights_df["date"].dt.year
+    load.load_dates(dw, int(years.min()), int(years.max()))
     # load fact tables
-    load.load_facts(dw, transform.get_facts(flights_df, reports_df, maint_df, extract.extract_reporterslookup()))  # type: ignore
+    load.load_facts(dw, transform.get_facts(flights_df, reports_df, maint_df, reporters_lookup))  # type: ignore
     # ====================================================================================================================================
     # done
     dw.close()
@@ -1,46 +1,146 @@
+import functools
+import hashlib
 import logging
+import os
+import time
 from pathlib import Path
 import psycopg2
+from psycopg2.extensions import make_dsn
+from psycopg2.extras import execute_values
 import pandas as pd
-import csv
 import warnings
-from pygrametl.datasources import CSVSource, SQLSource
+from concurrent.futures import ThreadPoolExecutor
+import duckdb
 
 # ====================================================================================================================================
 # Project paths configuration
 PROJECT_ROOT = Path(__file__).parent.parent
 CONFIG_DIR = PROJECT_ROOT / "config"
 DATA_DIR = PROJECT_ROOT / "data" / "lookups"
+# Parquet copies of the extracted source tables, reused while younger than SOURCE_CACHE_TTL
+# seconds (DW_SOURCE_CACHE_TTL; unset or 0 always reads the source)
+SOURCE_CACHE_DIR = PROJECT_ROOT / "data" / "cache"
+SOURCE_CACHE_TTL = float(os.environ.get("DW_SOURCE_CACHE_TTL", 0))
+
+# Source columns read by the transformations (nothing else is requested from the source)
+FLIGHT_COLUMNS = (
+    "aircraftregistration",
+    "cancelled",
+    "actualdeparture",
+    "actualarrival",
+    "scheduleddeparture",
+    "scheduledarrival",
+)
+MAINT_COLUMNS = (
+    "aircraftregistration",
+    "scheduledarrival",
+    "scheduleddeparture",
+    "programmed",
+)
+REPORT_COLUMNS = (
+    "aircraftregistration",
+    "reportingdate",
+    "reporteurclass",
+    "reporteurid",
+)
+# Reporter roles counted by the DW; reports of any other role never reach a fact table
+REPORT_ROLES = ("PIREP", "MAREP")
+# Manufacturers the baseline queries report on (aircraft of any other are reported by registration)
+BASELINE_MANUFACTURERS = ("Airbus", "Boeing")
+# Rows fetched per round trip by the server-side cursors of the baseline queries
+BASELINE_ITERSIZE = 10_000
+# Seconds a baseline query result is reused before the source is queried again
+BASELINE_CACHE_TTL = 300
+# Low-cardinality source columns, extracted as pandas categoricals (integer codes per row)
+CATEGORY_COLUMNS = ("aircraftregistration", "reporteurclass")
 
 # ====================================================================================================================================
-# Connect to the PostgreSQL source
-path = CONFIG_DIR / "db_conf.txt"
-if not path.is_file():
-    raise FileNotFoundError(
-        f"Database configuration file '{path.absolute()}' not found."
-    )
-try:
-    parameters = {}
-    # Read the database configuration from the provided txt file, line by line
-    with open(path, "r") as f:
-        lines = f.readlines()
-        for line in lines:
-            parameters[line.split("=", 1)[0]] = line.split("=", 1)[1].strip()
-    conn = psycopg2.connect(
+# Connections to the PostgreSQL source, opened lazily on first use and reused afterwards
+@functools.lru_cache(maxsize=1)
+def read_db_config() -> dict[str, str]:
+    """
+    Prec: config/db_conf.txt exists, with one key=value pair per line
+    Post: returns the database configuration parameters (parsed once); password is optional
+    """
+    path = CONFIG_DIR / "db_conf.txt"
+    if not path.is_file():
+        raise FileNotFoundError(
+            f"Database configuration file '{path.absolute()}' not found."
+        )
+    try:
+        parameters = {}
+        # Read the database configuration from the provided txt file, one split per line
+        for line in path.read_text().splitlines():
+            key, sep, value = line.partition("=")
+            if sep:
+                parameters[key.strip()] = value.strip()
+        missing = {"dbname", "user", "ip", "port"} - parameters.keys()
+        if missing:
+            raise KeyError(f"Missing parameters: {sorted(missing)}")
+        return parameters
+    except Exception as e:
+        logging.critical(f"[read_db_config] Error parsing {path}: {e}")
+        raise ValueError(
+            f"Database configuration file '{path.absolute()}' not properly formatted (check file 'config/db_conf.example.txt')."
+        ) from e
+
+
+@functools.lru_cache(maxsize=1)
+def get_source_dsn() -> str:
+    """
+    Prec: valid config/db_conf.txt
+    Post: returns the libpq connection string of the source, shared by both connections.
+    Without a password entry libpq takes it from PGPASSWORD or ~/.pgpass
+    """
+    parameters = read_db_config()
+    return make_dsn(
         dbname=parameters["dbname"],
         user=parameters["user"],
-        password=parameters["password"],
+        password=parameters.get("password"),
         host=parameters["ip"],
         port=parameters["port"],
     )
-except psycopg2.Error as e:
-    print(e)
-    raise ValueError(f"Unable to connect to the database: {parameters}")
-except Exception as e:
-    print(e)
-    raise ValueError(
-        f"Database configuration file '{path.absolute()}' not properly formatted (check file 'config/db_conf.example.txt')."
-    )
+
+
+def source_description() -> str:
+    """
+    Prec: valid config/db_conf.txt
+    Post: returns the source database and server, for error messages (never the password)
+    """
+    parameters = read_db_config()
+    return f"{parameters['dbname']} at {parameters['ip']}:{parameters['port']}"
+
+
+@functools.lru_cache(maxsize=1)
+def get_conn():
+    """
+    Prec: valid config/db_conf.txt
+    Post: returns the psycopg2 connection to the source, used by the baseline queries
+    """
+    try:
+        return psycopg2.connect(get_source_dsn())
+    except psycopg2.Error as e:
+        logging.critical(f"[get_conn] Error connecting to the source: {e}")
+        raise ValueError(f"Unable to connect to the database {source_description()}") from e
+
+
+@functools.lru_cache(maxsize=1)
+def get_source_db() -> duckdb.DuckDBPyConnection:
+    """
+    Prec: valid config/db_conf.txt
+    Post: returns a DuckDB connection with the source attached as pg through the postgres
+    extension, which scans the source tables straight into columnar DataFrames
+    """
+    dsn = get_source_dsn().replace("'", "''")
+    try:
+        source_db = duckdb.connect()
+        source_db.execute("INSTALL postgres; LOAD postgres;")
+        source_db.execute(f"ATTACH '{dsn}' AS pg (TYPE postgres, READ_ONLY)")
+        return source_db
+    except duckdb.Error as e:
+        logging.critical(f"[get_source_db] Error attaching the source: {e}")
+        raise ValueError(f"Unable to connect to the database {source_description()}") from e
+
 
 # Configure logging for information and errors
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -52,91 +152,127 @@ warnings.filterwarnings("ignore", message=".*pandas only supports SQLAlchemy.*")
 # extracting functions
 
 
-def extract_flights() -> SQLSource:
+def read_source_table(
+    table: str, columns: tuple[str, ...], where: str = ""
+) -> pd.DataFrame:
+    """
+    Prec: valid config/db_conf.txt
+    Post: returns the given columns of table (schema-qualified) as a DataFrame, restricted
+    to the rows satisfying the where condition if given (evaluated by the source database),
+    with the CATEGORY_COLUMNS as categoricals (read from SOURCE_CACHE_DIR while the cache is fresh)
+    """
+    query = f'SELECT {", ".join(columns)} FROM pg.{table}'
+    if where:
+        query += f" WHERE {where}"
+    # keyed on the query text too, so a cached table is not reused for other columns or rows
+    name = table.replace('"', "").lower()
+    digest = hashlib.sha1(query.encode()).hexdigest()[:12]
+    cache = SOURCE_CACHE_DIR / f"{name}-{digest}.parquet"
+    if SOURCE_CACHE_TTL and cache.is_file():
+        if time.time() - cache.stat().st_mtime < SOURCE_CACHE_TTL:
+            logging.info(f"Reading {table} from {cache}")
+            return pd.read_parquet(cache, memory_map=True)
+    # own cursor, so the source tables can be read from several threads (see extract_sources)
+    with get_source_db().cursor() as cursor:
+        df = cursor.sql(query).df()
+    df = df.astype({col: "category" for col in columns if col in CATEGORY_COLUMNS})
+    if SOURCE_CACHE_TTL:
+        SOURCE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(cache, compression="zstd", index=False)
+    return df
+
+
+def extract_flights() -> pd.DataFrame:
     """
-    Prec: connection to DBBDA established in conn
-    Post: Extract flight data from AIMS.flights and return it as SQLSource
+    Prec: valid config/db_conf.txt
+    Post: Extract flight data from AIMS.flights and return it as a DataFrame
     """
     try:
-        relevant_flight_cols = [
-            "aircraftregistration",
-            "cancelled",
-            "actualdeparture",
-            "actualarrival",
-            "scheduleddeparture",
-            "scheduledarrival",
-        ]
-        query = f'SELECT {", ".join(relevant_flight_cols)} FROM "AIMS"."flights"'
-        return SQLSource(connection=conn, query=query)
+        return read_source_table('"AIMS"."flights"', FLIGHT_COLUMNS)
     except Exception as e:
-        logging.critical(f"Error creating flight data source: {e}")
+        logging.critical(f"Error extracting flight data: {e}")
         raise e
 
 
-def extract_maint() -> SQLSource:
+def extract_maint() -> pd.DataFrame:
     """
-    Prec: connection to DBBDA established in conn
-    Post: Extract maintenance data from "AIMS.maintenance" and return it as SQLSource
+    Prec: valid config/db_conf.txt
+    Post: Extract maintenance data from "AIMS.maintenance" and return it as a DataFrame
     """
     try:
-        relevant_maint_cols = [
-            "aircraftregistration",
-            "scheduledarrival",
-            "scheduleddeparture",
-            "programmed",
-        ]
-        query = f'SELECT {", ".join(relevant_maint_cols)} FROM "AIMS"."maintenance"'
-        return SQLSource(connection=conn, query=query)
+        return read_source_table('"AIMS"."maintenance"', MAINT_COLUMNS)
     except Exception as e:
-        logging.critical(f"Error creating maintenance data source: {e}")
+        logging.critical(f"Error extracting maintenance data: {e}")
         raise e
 
 
-def extract_reports() -> SQLSource:
+def extract_reports() -> pd.DataFrame:
     """
-    Prec: connection to DBBDA established in conn
-    Post: Extract report data from "AMOS.postflightreports" and return it as SQLSource
+    Prec: valid config/db_conf.txt
+    Post: Extract PIREP and MAREP reports from "AMOS.postflightreports" and return them as a DataFrame
     """
     try:
-        relevant_reports_cols = [
-            "aircraftregistration",
-            "reportingdate",
-            "reporteurclass",
-            "reporteurID",
-        ]
-        query = (
-            f'SELECT {", ".join(relevant_reports_cols)} FROM "AMOS"."postflightreports"'
+        roles = ", ".join(f"'{role}'" for role in REPORT_ROLES)
+        return read_source_table(
+            '"AMOS"."postflightreports"',
+            REPORT_COLUMNS,
+            where=f"reporteurclass IN ({roles})",
         )
-        return SQLSource(connection=conn, query=query)
     except Exception as e:
-        logging.critical(f"Error creating reports data source: {e}")
+        logging.critical(f"Error extracting reports data: {e}")
         raise e
 
 
-def extract_reporterslookup() -> CSVSource:
+def extract_sources() -> tuple[pd.DataFrame, ...]:
+    """
+    Prec: valid config/db_conf.txt and the lookup CSV files exist in data/lookups/
+    Post: returns the aircraft and reporter lookups and the flights, maintenance and reports
+    DataFrames, extracted concurrently (the source reads and the CSV parsing wait independently)
+    """
+    get_source_db()  # connect once before the workers share the connection
+    extract_funcs = (
+        extract_aircraftlookup,
+        extract_reporterslookup,
+        extract_flights,
+        extract_maint,
+        extract_reports,
+    )
+    with ThreadPoolExecutor(max_workers=len(extract_funcs)) as pool:
+        futures = [pool.submit(func) for func in extract_funcs]
+        return tuple(future.result() for future in futures)
+
+
+def read_lookup_csv(path: Path) -> pd.DataFrame:
+    """
+    Prec: path is a CSV file with a header row
+    Post: returns its content as a DataFrame, parsed by DuckDB's CSV reader
+    """
+    # own connection, so several lookups can be parsed from different threads (see extract_sources)
+    with duckdb.connect() as con:
+        return con.sql(f"SELECT * FROM read_csv_auto('{path}', header = true)").df()
+
+
+def extract_reporterslookup() -> pd.DataFrame:
     """
     Prec: maintenance_personnel.csv exists in data/lookups/
-    Post: Extract reporter information from CSV file and store it in extracted_data
+    Post: Extract reporter information from CSV file and return it as a DataFrame
     """
     path = DATA_DIR / "maintenance_personnel.csv"
     try:
-        f = open(path, "r", 16384, encoding="utf-8")  # recomanat per pygrametl
-        return CSVSource(f=f, delimiter=",")  # crea la font
+        return read_lookup_csv(path)
     except Exception as e:
         logging.critical(f"[extract_reporterslookup] Error reading {path}: {e}")
         raise e
 
 
-def extract_aircraftlookup() -> CSVSource:
+def extract_aircraftlookup() -> pd.DataFrame:
     """
     Prec: aircraft-manufacturerinfo-lookup.csv exists in data/lookups/
-    Post: extracts aircraft manufacturer info from a CSV file as a CSVSource iterable
+    Post: extracts aircraft manufacturer info from a CSV file as a DataFrame
     """
     path = DATA_DIR / "aircraft-manufacturerinfo-lookup.csv"
     try:
-        f = open(path, "r", 16384, encoding="utf-8")  # recomanat per pygrametl
-        csv_source = CSVSource(f=f, delimiter=",")  # crea la font
-        return csv_source
+        return read_lookup_csv(path)
     except Exception as e:
         logging.critical(f"[extract_aircraftlookup] Error reading {path}: {e}")
         raise e
@@ -144,212 +280,340 @@ def extract_aircraftlookup() -> CSVSource:
 
 # ====================================================================================================================================
 # Baseline queries
-
-
-def get_aircrafts_per_manufacturer() -> dict[str, list[str]]:
-    """
-    Prec: aircraft-manufacturerinfo-lookup.csv exists in data/lookups/
-    Post: Returns a dictionary with one entry per manufacturer and a list of aircraft identifiers as values.
-    """
-    path = DATA_DIR / "aircraft-manufacturerinfo-lookup.csv"
-    aircrafts: dict[str, list[str]] = {
-        "Airbus": [],
-        "Boeing": [],
-    }
-    with open(path, encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            manufacturer = row["aircraft_manufacturer"]
-            registration = row["aircraft_reg_code"]
-            if manufacturer in aircrafts:
-                aircrafts[manufacturer].append(registration)
-    return aircrafts
-
-
-def query_utilization_baseline():
-    aircrafts = get_aircrafts_per_manufacturer()
-    cur = conn.cursor()
-    cur.execute(
-        f"""
-        WITH atomic_data AS (
+# Aircraft utilization KPIs per manufacturer and year, computed on the source
+UTILIZATION_BASELINE_SQL = """
+    WITH
+        -- each leg is aggregated per aircraft and year before the union, so the final
+        -- GROUP BY only combines a few rows per aircraft (and still counts each aircraft once)
+        flights_agg AS (
             SELECT f.aircraftregistration,
-                CASE 
-                    WHEN f.aircraftregistration in ('{"','".join(aircrafts.get("Airbus", []))}') THEN 'Airbus'
-                    WHEN f.aircraftregistration in ('{"','".join(aircrafts.get("Boeing", []))}') THEN 'Boeing'
-                    ELSE f.aircraftregistration
-                    END AS manufacturer, 
+                COALESCE(l.manufacturer, f.aircraftregistration) AS manufacturer,
                 DATE_PART('year', f.scheduleddeparture)::text AS year,
-                CASE WHEN f.cancelled 
-                    THEN 0
-                    ELSE EXTRACT(EPOCH FROM f.actualarrival-f.actualdeparture) / 3600
-                    END AS flightHours,
-                CASE WHEN f.cancelled 
-                    THEN 0
-                    ELSE 1
-                    END AS flightCycles,
-                CASE WHEN f.cancelled
-                    THEN 1
-                    ELSE 0
-                    END AS cancellations,
-                CASE WHEN f.cancelled
-                    THEN 0
-                    ELSE CASE WHEN EXTRACT(EPOCH FROM f.actualarrival - f.scheduledarrival) / 60 > 15
-                        THEN 1
-                        ELSE 0
-                        END
-                    END AS delays,
-                CASE WHEN f.cancelled
-                    THEN 0
-                    ELSE CASE WHEN EXTRACT(EPOCH FROM f.actualarrival - f.scheduledarrival) / 60 > 15
-                        THEN EXTRACT(EPOCH FROM f.actualarrival - f.scheduledarrival) / 60
-                        ELSE 0
-                        END
-                    END AS delayedMinutes,
+                SUM(x.nc * x.fh) AS flightHours,
+                SUM(x.nc) AS flightCycles,
+                SUM(1 - x.nc) AS cancellations,
+                SUM(x.nc * (x.dm > 15)::int) AS delays,
+                SUM(x.nc * (x.dm > 15)::int * x.dm) AS delayedMinutes,
                 0 AS scheduledOutOfService,
                 0 AS unScheduledOutOfService
-            FROM "AIMS".flights f
-            UNION ALL
-            SELECT m.aircraftregistration,           
-                CASE 
-                    WHEN m.aircraftregistration in ('{"','".join(aircrafts.get("Airbus", []))}') THEN 'Airbus'
-                    WHEN m.aircraftregistration in ('{"','".join(aircrafts.get("Boeing", []))}') THEN 'Boeing'
-                    ELSE m.aircraftregistration
-                    END AS manufacturer, 
+            FROM "AIMS".flights f LEFT JOIN mfr_lookup l USING (aircraftregistration)
+                -- per-row expressions evaluated once and combined arithmetically (no CASE)
+                -- (the times of cancelled flights may be NULL, and count as 0; a NULL cancelled
+                -- flag counts as flown, like the ELSE branch of the CASE it replaced)
+                CROSS JOIN LATERAL (
+                    SELECT COALESCE(NOT f.cancelled, true)::int AS nc,
+                        COALESCE(EXTRACT(EPOCH FROM f.actualarrival-f.actualdeparture) / 3600, 0) AS fh,
+                        COALESCE(EXTRACT(EPOCH FROM f.actualarrival - f.scheduledarrival) / 60, 0) AS dm
+                ) x
+            GROUP BY 1, 2, 3
+            ),
+        maint_agg AS (
+            SELECT m.aircraftregistration,
+                COALESCE(l.manufacturer, m.aircraftregistration) AS manufacturer,
                 DATE_PART('year', m.scheduleddeparture)::text AS year,
                 0 AS flightHours,
                 0 AS flightCycles,
                 0 AS cancellations,
                 0 AS delays,
                 0 AS delayedMinutes,
-                CASE WHEN m.programmed
+                SUM(CASE WHEN m.programmed
                     THEN EXTRACT(EPOCH FROM m.scheduledarrival-m.scheduleddeparture)/(24*3600)
                     ELSE 0
-                    END AS scheduledOutOfService,
-                CASE WHEN m.programmed
+                    END) AS scheduledOutOfService,
+                SUM(CASE WHEN m.programmed
                     THEN 0
                     ELSE EXTRACT(EPOCH FROM m.scheduledarrival-m.scheduleddeparture)/(24*3600)
-                    END AS unScheduledOutOfService
-            FROM "AIMS".maintenance m
+                    END) AS unScheduledOutOfService
+            FROM "AIMS".maintenance m LEFT JOIN mfr_lookup l USING (aircraftregistration)
+            GROUP BY 1, 2, 3
+            ),
+        atomic_data AS (
+            -- UNION ALL, never UNION: the legs are disjoint by construction (flights vs maintenance)
+            -- and equal rows of one leg must all be summed, so deduplicating would be slow and wrong
+            SELECT * FROM flights_agg
+            UNION ALL
+            SELECT * FROM maint_agg
+            ),
+        fleet AS (
+            -- aircraft per manufacturer and year: this UNION (the only one) deliberately deduplicates
+            -- the aircraft of both legs, so they are counted without a COUNT(DISTINCT)
+            SELECT manufacturer, year, COUNT(*) AS nac
+            FROM (
+                SELECT aircraftregistration, manufacturer, year FROM flights_agg
+                UNION
+                SELECT aircraftregistration, manufacturer, year FROM maint_agg
+                ) ac
+            GROUP BY manufacturer, year
+            ),
+        aggregated AS (
+            -- every sum computed once per group
+            SELECT a.manufacturer, a.year,
+                SUM(a.flightHours) AS sh,
+                SUM(a.flightCycles) AS sc,
+                SUM(a.scheduledOutOfService) AS ss,
+                SUM(a.unscheduledOutOfService) AS us,
+                SUM(a.delays) AS sd,
+                SUM(a.cancellations) AS sca,
+                SUM(a.delayedMinutes) AS sdm
+            FROM atomic_data a
+            GROUP BY a.manufacturer, a.year
             )
-        SELECT a.manufacturer, a.year, 
-            ROUND(SUM(a.flightHours)/COUNT(DISTINCT a.aircraftregistration), 2) AS FH,
-            ROUND(SUM(a.flightCycles)/COUNT(DISTINCT a.aircraftregistration), 2) AS TakeOff,
-            ROUND(SUM(a.scheduledOutOfService)/COUNT(DISTINCT a.aircraftregistration), 2) AS ADOSS,
-            ROUND(SUM(a.unscheduledOutOfService)/COUNT(DISTINCT a.aircraftregistration), 2) AS ADOSU,
-            ROUND((SUM(a.scheduledOutOfService)+SUM(a.unscheduledOutOfService))/COUNT(DISTINCT a.aircraftregistration), 2) AS ADOS,
-            365-ROUND((SUM(a.scheduledOutOfService)+SUM(a.unscheduledOutOfService))/COUNT(DISTINCT a.aircraftregistration), 2) AS ADIS, -- This assumes a period of one year (as in the group by)
-            ROUND(ROUND(SUM(a.flightHours)/COUNT(DISTINCT a.aircraftregistration), 2)/((365-ROUND((SUM(a.scheduledOutOfService)+SUM(a.unscheduledOutOfService))/COUNT(DISTINCT a.aircraftregistration), 2))*24), 2) AS DU,
-            ROUND(ROUND(SUM(a.flightCycles)/COUNT(DISTINCT a.aircraftregistration), 2)/(365-ROUND((SUM(a.scheduledOutOfService)+SUM(a.unscheduledOutOfService))/COUNT(DISTINCT a.aircraftregistration), 2)), 2) AS DC,
-            100*ROUND(SUM(delays)/ROUND(SUM(a.flightCycles), 2), 4) AS DYR,
-            100*ROUND(SUM(a.cancellations)/ROUND(SUM(a.flightCycles), 2), 4) AS CNR,
-            100-ROUND(100*(SUM(delays)+SUM(cancellations))/SUM(a.flightCycles), 2) AS TDR,
-            100*ROUND(SUM(delayedMinutes)/SUM(delays),2) AS ADD
-        FROM atomic_data a
-        GROUP BY a.manufacturer, a.year
-        ORDER BY a.manufacturer, a.year;
-        """
+    SELECT a.manufacturer, a.year,
+        ROUND(a.sh/f.nac, 2) AS FH,
+        ROUND(a.sc::numeric/f.nac, 2) AS TakeOff,
+        ROUND(a.ss/f.nac, 2) AS ADOSS,
+        ROUND(a.us/f.nac, 2) AS ADOSU,
+        ROUND((a.ss+a.us)/f.nac, 2) AS ADOS,
+        365-ROUND((a.ss+a.us)/f.nac, 2) AS ADIS, -- This assumes a period of one year (as in the group by)
+        ROUND(ROUND(a.sh/f.nac, 2)/((365-ROUND((a.ss+a.us)/f.nac, 2))*24), 2) AS DU,
+        ROUND(ROUND(a.sc::numeric/f.nac, 2)/(365-ROUND((a.ss+a.us)/f.nac, 2)), 2) AS DC,
+        100*ROUND(a.sd/ROUND(a.sc, 2), 4) AS DYR,
+        100*ROUND(a.sca/ROUND(a.sc, 2), 4) AS CNR,
+        100.0-ROUND(100.0*(a.sd+a.sca)/a.sc, 2) AS TDR,
+        100*ROUND(a.sdm/a.sd,2) AS ADD
+    FROM aggregated a
+        JOIN fleet f USING (manufacturer, year)
+    ORDER BY a.manufacturer, a.year
+"""
+# Reporting rates per manufacturer and year (needs utilization_by_mfr_year)
+REPORTING_BASELINE_SQL = """
+    WITH
+        atomic_data_reporting AS (
+            SELECT
+                COALESCE(l.manufacturer, f.aircraftregistration) AS manufacturer, 
+                DATE_PART('year', f.reportingdate)::text AS year,
+                COUNT(*) AS counter
+            FROM "AMOS".postflightreports f LEFT JOIN mfr_lookup l USING (aircraftregistration)
+            GROUP BY 1, 2  -- output columns (manufacturer is also a column of l)
+            )
+    SELECT f1.manufacturer, f1.year,
+        1000*ROUND(f1.counter/f2.flightHours, 3) AS RRh,
+        100*ROUND(f1.counter/f2.flightCycles, 2) AS RRc               
+    FROM atomic_data_reporting f1
+        JOIN utilization_by_mfr_year f2 ON f2.manufacturer = f1.manufacturer AND f1.year = f2.year
+    ORDER BY f1.manufacturer, f1.YEAR
+"""
+# Reporting rates per manufacturer, year and role (needs utilization_by_mfr_year)
+REPORTING_PER_ROLE_BASELINE_SQL = """
+    WITH
+        atomic_data_reporting AS (
+            SELECT
+                COALESCE(l.manufacturer, f.aircraftregistration) AS manufacturer, 
+                DATE_PART('year', f.reportingdate)::text AS year,
+                f.reporteurclass AS role,
+                COUNT(*) AS counter
+            FROM "AMOS".postflightreports f LEFT JOIN mfr_lookup l USING (aircraftregistration)
+            GROUP BY 1, 2, 3  -- output columns (manufacturer is also a column of l)
+            )
+    SELECT f1.manufacturer, f1.year, f1.role,
+        1000*ROUND(f1.counter/f2.flightHours, 3) AS RRh,
+        100*ROUND(f1.counter/f2.flightCycles, 2) AS RRc              
+    FROM atomic_data_reporting f1
+        JOIN utilization_by_mfr_year f2 ON f2.manufacturer = f1.manufacturer AND f1.year = f2.year
+    ORDER BY f1.manufacturer, f1.year, f1.role
+"""
+# The three baseline queries in a single statement: each result row is tagged with the query
+# it belongs to (kind) and carries its KPIs as an array, in the order of the query's columns
+ALL_BASELINES_SQL = f"""
+    SELECT 'utilization' AS kind, manufacturer, year, NULL::text AS role,
+        ARRAY[FH, TakeOff, ADOSS, ADOSU, ADOS, ADIS, DU, DC, DYR, CNR, TDR, add]::numeric[] AS kpis
+    FROM ({UTILIZATION_BASELINE_SQL}) u
+    UNION ALL
+    SELECT 'reporting', manufacturer, year, NULL, ARRAY[RRh, RRc]::numeric[]
+    FROM ({REPORTING_BASELINE_SQL}) r
+    UNION ALL
+    SELECT 'reporting_per_role', manufacturer, year, role, ARRAY[RRh, RRc]::numeric[]
+    FROM ({REPORTING_PER_ROLE_BASELINE_SQL}) rr
+    ORDER BY kind, manufacturer, year, role
+"""
+
+
+def get_aircrafts_per_manufacturer() -> dict[str, tuple[str, ...]]:
+    """
+    Prec: aircraft-manufacturerinfo-lookup.csv exists in data/lookups/
+    Post: Returns a dictionary with one entry per manufacturer and a tuple of aircraft identifiers as values
+    (the CSV is read again only after it changes).
+    """
+    path = DATA_DIR / "aircraft-manufacturerinfo-lookup.csv"
+    return read_aircrafts_per_manufacturer(path.stat().st_mtime)
+
+
+@functools.lru_cache(maxsize=1)
+def read_aircrafts_per_manufacturer(mtime: float) -> dict[str, tuple[str, ...]]:
+    """
+    Prec: mtime is the modification time of aircraft-manufacturerinfo-lookup.csv (only the cache key)
+    Post: Returns the aircraft of each manufacturer in the CSV, parsed once per mtime
+    """
+    lookup = extract_aircraftlookup()
+    lookup = lookup[lookup["aircraft_manufacturer"].isin(BASELINE_MANUFACTURERS)]
+    aircrafts: dict[str, tuple[str, ...]] = {
+        manufacturer: () for manufacturer in BASELINE_MANUFACTURERS
+    }
+    # one vectorized groupby instead of a Python loop over the rows
+    aircrafts.update(
+        lookup.groupby("aircraft_manufacturer")["aircraft_reg_code"].agg(tuple).to_dict()
     )
-    result = cur.fetchall()
-    cur.close()
-    return result
+    return aircrafts
+
+
+def create_manufacturer_lookup():
+    """
+    Prec: valid config/db_conf.txt and aircraft-manufacturerinfo-lookup.csv exists in data/lookups/
+    Post: the temporary table mfr_lookup in the source maps the aircraft of
+    get_aircrafts_per_manufacturer to their manufacturer (recreated only after the CSV changes)
+    """
+    path = DATA_DIR / "aircraft-manufacturerinfo-lookup.csv"
+    build_manufacturer_lookup(path.stat().st_mtime)
+
+
+@functools.lru_cache(maxsize=1)
+def build_manufacturer_lookup(mtime: float):
+    """
+    Prec: mtime is the modification time of aircraft-manufacturerinfo-lookup.csv (only the cache key)
+    Post: (re)creates the temporary table mfr_lookup in the source from the CSV, once per mtime
+    """
+    aircrafts = read_aircrafts_per_manufacturer(mtime)
+    conn = get_conn()
+    # the connection block commits (the temporary table outlives the transaction) or rolls back
+    with conn, conn.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS mfr_lookup")
+        cur.execute(
+            "CREATE TEMP TABLE mfr_lookup (aircraftregistration text PRIMARY KEY, manufacturer text)"
+        )
+        execute_values(
+            cur,
+            # a registration listed twice keeps its first manufacturer
+            "INSERT INTO mfr_lookup VALUES %s ON CONFLICT (aircraftregistration) DO NOTHING",
+            [(reg, manufacturer) for manufacturer, regs in aircrafts.items() for reg in regs],
+            page_size=1000,
+        )
+    # utilization_by_mfr_year was derived from the previous lookup
+    build_flight_utilization.cache_clear()
+
+
+def create_flight_utilization():
+    """
+    Prec: valid config/db_conf.txt
+    Post: the temporary table utilization_by_mfr_year in the source holds the flight hours and
+    cycles per manufacturer and year, shared by the reporting baseline queries (recreated only
+    after mfr_lookup changes or invalidate_baseline_cache())
+    """
+    create_manufacturer_lookup()
+    build_flight_utilization()
+
+
+@functools.lru_cache(maxsize=1)
+def build_flight_utilization():
+    """
+    Prec: mfr_lookup exists in the source (see create_manufacturer_lookup)
+    Post: (re)creates the temporary table utilization_by_mfr_year in the source
+    """
+    conn = get_conn()
+    with conn, conn.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS utilization_by_mfr_year")
+        cur.execute(
+            """
+            CREATE TEMP TABLE utilization_by_mfr_year AS
+            SELECT
+                COALESCE(l.manufacturer, f.aircraftregistration) AS manufacturer, 
+                DATE_PART('year', f.scheduleddeparture)::text AS year,
+                CAST(SUM(CASE WHEN f.cancelled 
+                    THEN 0
+                    ELSE EXTRACT(EPOCH FROM f.actualarrival-f.actualdeparture) / 3600
+                    END) AS numeric) AS flightHours,
+                CAST(SUM(CASE WHEN f.cancelled 
+                    THEN 0
+                    ELSE 1
+                    END) AS numeric) AS flightCycles
+            FROM "AIMS".flights f LEFT JOIN mfr_lookup l USING (aircraftregistration)
+            GROUP BY 1, 2  -- output columns (manufacturer is also a column of l)
+            """
+        )
+
+
+def run_baseline_query(name: str, sql: str) -> list[tuple]:
+    """
+    Prec: valid config/db_conf.txt and sql is a single SELECT on the source
+    Post: returns the rows of sql, streamed from the server-side cursor name in batches
+    of BASELINE_ITERSIZE rows; the transaction is ended either way, so a failed query does
+    not leave the shared connection unusable
+    """
+    conn = get_conn()
+    with conn, conn.cursor(name=name) as cur:
+        cur.itersize = BASELINE_ITERSIZE
+        cur.execute(sql)
+        return list(cur)
+
+
+# Results of the baseline queries by function name, with the time they were computed
+_baseline_cache: dict[str, tuple[float, list[tuple]]] = {}
+
+
+def cached_baseline(query):
+    """
+    Prec: query is a baseline query function without arguments
+    Post: returns query wrapped so its result is reused for BASELINE_CACHE_TTL seconds
+    """
+
+    @functools.wraps(query)
+    def wrapper():
+        cached = _baseline_cache.get(query.__name__)
+        if cached and time.monotonic() - cached[0] < BASELINE_CACHE_TTL:
+            return cached[1]
+        result = query()
+        _baseline_cache[query.__name__] = (time.monotonic(), result)
+        return result
 
+    return wrapper
 
+
+def invalidate_baseline_cache():
+    """
+    Prec: valid config/db_conf.txt
+    Post: the next baseline queries read the source again (call after loading new source data)
+    """
+    _baseline_cache.clear()
+    build_manufacturer_lookup.cache_clear()
+    build_flight_utilization.cache_clear()
+
+
+@cached_baseline
+def query_utilization_baseline():
+    create_manufacturer_lookup()
+    return run_baseline_query("utilization_baseline", UTILIZATION_BASELINE_SQL)
+
+
+@cached_baseline
 def query_reporting_baseline():
-    aircrafts = get_aircrafts_per_manufacturer()
-    cur = conn.cursor()
-    cur.execute(
-        f"""
-        WITH 
-            atomic_data_utilization AS (
-                SELECT
-                    CASE 
-                        WHEN f.aircraftregistration in ('{"','".join(aircrafts.get("Airbus", []))}') THEN 'Airbus'
-                        WHEN f.aircraftregistration in ('{"','".join(aircrafts.get("Boeing", []))}') THEN 'Boeing'
-                        ELSE f.aircraftregistration
-                        END AS manufacturer, 
-                    DATE_PART('year', f.scheduleddeparture)::text AS year,
-                    CAST(SUM(CASE WHEN f.cancelled 
-                        THEN 0
-                        ELSE EXTRACT(EPOCH FROM f.actualarrival-f.actualdeparture) / 3600
-                        END) AS numeric) AS flightHours,
-                    CAST(SUM(CASE WHEN f.cancelled 
-                        THEN 0
-                        ELSE 1
-                        END) AS numeric) AS flightCycles
-                FROM "AIMS".flights f
-                GROUP BY manufacturer, YEAR
-                ),
-            atomic_data_reporting AS (
-                SELECT
-                    CASE 
-                        WHEN f.aircraftregistration in ('{"','".join(aircrafts.get("Airbus", []))}') THEN 'Airbus'
-                        WHEN f.aircraftregistration in ('{"','".join(aircrafts.get("Boeing", []))}') THEN 'Boeing'
-                        ELSE f.aircraftregistration
-                        END AS manufacturer, 
-                    DATE_PART('year', f.reportingdate)::text AS year,
-                    COUNT(*) AS counter
-                FROM "AMOS".postflightreports f
-                GROUP BY manufacturer, YEAR
-                )
-        SELECT f1.manufacturer, f1.year,
-            1000*ROUND(f1.counter/f2.flightHours, 3) AS RRh,
-            100*ROUND(f1.counter/f2.flightCycles, 2) AS RRc               
-        FROM atomic_data_reporting f1
-            JOIN atomic_data_utilization f2 ON f2.manufacturer = f1.manufacturer AND f1.year = f2.year
-        ORDER BY f1.manufacturer, f1.YEAR;
-        """
-    )
-    result = cur.fetchall()
-    cur.close()
-    return result
+    create_flight_utilization()
+    return run_baseline_query("reporting_baseline", REPORTING_BASELINE_SQL)
 
 
+@cached_baseline
 def query_reporting_per_role_baseline():
-    aircrafts = get_aircrafts_per_manufacturer()
-    cur = conn.cursor()
-    cur.execute(
-        f"""
-        WITH 
-            atomic_data_utilization AS (
-                SELECT
-                    CASE 
-                        WHEN f.aircraftregistration in ('{"','".join(aircrafts.get("Airbus", []))}') THEN 'Airbus'
-                        WHEN f.aircraftregistration in ('{"','".join(aircrafts.get("Boeing", []))}') THEN 'Boeing'
-                        ELSE f.aircraftregistration
-                        END AS manufacturer, 
-                    DATE_PART('year', f.scheduleddeparture)::text AS year,
-                    CAST(SUM(CASE WHEN f.cancelled 
-                        THEN 0
-                        ELSE EXTRACT(EPOCH FROM f.actualarrival-f.actualdeparture) / 3600
-                        END) AS numeric) AS flightHours,
-                    CAST(SUM(CASE WHEN f.cancelled 
-                        THEN 0
-                        ELSE 1
-                        END) AS numeric) AS flightCycles
-                FROM "AIMS".flights f
-                GROUP BY manufacturer, YEAR
-                ),
-            atomic_data_reporting AS (
-                SELECT
-                    CASE 
-                        WHEN f.aircraftregistration in ('{"','".join(aircrafts.get("Airbus", []))}') THEN 'Airbus'
-                        WHEN f.aircraftregistration in ('{"','".join(aircrafts.get("Boeing", []))}') THEN 'Boeing'
-                        ELSE f.aircraftregistration
-                        END AS manufacturer, 
-                    DATE_PART('year', f.reportingdate)::text AS year,
-                    f.reporteurclass AS role,
-                    COUNT(*) AS counter
-                FROM "AMOS".postflightreports f
-                GROUP BY manufacturer, year, role
-                )
-        SELECT f1.manufacturer, f1.year, f1.role,
-            1000*ROUND(f1.counter/f2.flightHours, 3) AS RRh,
-            100*ROUND(f1.counter/f2.flightCycles, 2) AS RRc              
-        FROM atomic_data_reporting f1
-            JOIN atomic_data_utilization f2 ON f2.manufacturer = f1.manufacturer AND f1.year = f2.year
-        ORDER BY f1.manufacturer, f1.year, f1.role;
-        """
-    )
-    result = cur.fetchall()
-    cur.close()
-    return result
+    create_flight_utilization()
+    return run_baseline_query("reporting_per_role_baseline", REPORTING_PER_ROLE_BASELINE_SQL)
+
+
+def query_all_baselines() -> tuple[list[tuple], list[tuple], list[tuple]]:
+    """
+    Prec: valid config/db_conf.txt
+    Post: returns the results of query_utilization_baseline, query_reporting_baseline and
+    query_reporting_per_role_baseline computed with a single statement (one parse and one
+    round trip), and caches them for those functions
+    """
+    create_flight_utilization()
+    results: dict[str, list[tuple]] = {
+        "utilization": [],
+        "reporting": [],
+        "reporting_per_role": [],
+    }
+    for kind, manufacturer, year, role, kpis in run_baseline_query(
+        "all_baselines", ALL_BASELINES_SQL
+    ):
+        key = (manufacturer, year) if role is None else (manufacturer, year, role)
+        results[kind].append(key + tuple(kpis))
+    computed = time.monotonic()
+    for kind, result in results.items():
+        _baseline_cache[f"query_{kind}_baseline"] = (computed, result)
+    return results["utilization"], results["reporting"], results["reporting_per_role"]